@@ -0,0 +1,66 @@
+"""Functions to look up MAVLink dialects and message classes by name."""
+
+from functools import lru_cache
+from importlib import import_module
+from types import ModuleType
+from typing import Type
+
+from .types import MAVLinkMessage
+
+__all__ = ("get_mavlink_message_class", "import_dialect", "preload_dialects")
+
+
+_DIALECT_PACKAGE_PREFIX = "flockwave.protocols.mavlink.dialects.v20."
+"""Prefix of the fully qualified names of the MAVLink 2.0 dialect modules."""
+
+
+@lru_cache(maxsize=None)
+def import_dialect(dialect: str) -> ModuleType:
+    """Imports the MAVLink 2.0 dialect with the given name.
+
+    Results are cached so repeated calls do not go through the import
+    machinery again.
+
+    Parameters:
+        dialect: the name of the dialect, e.g. ``common`` or ``ardupilotmega``
+
+    Returns:
+        the module of the dialect
+    """
+    return import_module(_DIALECT_PACKAGE_PREFIX + dialect)
+
+
+def preload_dialects(*dialects: str) -> None:
+    """Imports the MAVLink 2.0 dialects with the given names in advance.
+
+    Dialect modules are large, so importing them takes a noticeable amount of
+    time. Call this function during startup to avoid paying this cost when
+    the first message of a dialect is processed.
+
+    Parameters:
+        dialects: the names of the dialects to import
+    """
+    for dialect in dialects:
+        import_dialect(dialect)
+
+
+@lru_cache(maxsize=None)
+def get_mavlink_message_class(dialect: str, type: str) -> Type[MAVLinkMessage]:
+    """Returns the class of the MAVLink message with the given type from the
+    given dialect.
+
+    Results are cached so this function is safe to call for every parsed or
+    sent message.
+
+    Parameters:
+        dialect: the name of the dialect, e.g. ``common`` or ``ardupilotmega``
+        type: the type of the message, e.g. ``HEARTBEAT``; case insensitive
+
+    Returns:
+        the message class
+
+    Raises:
+        AttributeError: if the dialect has no message with the given type
+    """
+    module = import_dialect(dialect)
+    return getattr(module, f"MAVLink_{type.lower()}_message")
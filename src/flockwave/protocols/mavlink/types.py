@@ -38,16 +38,18 @@ class MAVLinkMessage(Protocol):
 
     id: int
     msgname: str
-    fieldnames: List[str]
-    ordered_fieldnames: List[str]
-    fieldtypes: List[str]
+    fieldnames: Tuple[str, ...]
+    ordered_fieldnames: Tuple[str, ...]
+    fieldtypes: Tuple[str, ...]
     fielddisplays_by_name: Dict[str, str]
     fieldenums_by_name: Dict[str, str]
     fieldunits_by_name: Dict[str, str]
     native_format: bytearray
-    orders: List[int]
-    lengths: List[int]
-    array_lengths: List[int]
+    orders: Tuple[int, ...]
+    lengths: Tuple[int, ...]
+    array_lengths: Tuple[int, ...]
+    has_array: bool
+    cumulative_lengths: Tuple[int, ...]
     crc_extra: int = 0
     unpacker: Struct
     instance_field: Optional[str]
@@ -58,7 +60,7 @@ class MAVLinkMessage(Protocol):
     def get_header(self) -> MAVLinkHeader: ...
     def get_payload(self) -> Optional[bytes]: ...
     def get_crc(self) -> Optional[int]: ...
-    def get_fieldnames(self) -> List[str]: ...
+    def get_fieldnames(self) -> Sequence[str]: ...
     def get_type(self) -> str: ...
     def get_msgId(self) -> int: ...
     def get_srcSystem(self) -> int: ...
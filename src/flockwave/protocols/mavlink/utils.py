@@ -6,39 +6,108 @@ Released under GNU LGPL version 3 or later
 Modernized for Python 3.x by Tamas Nepusz
 """
 
-from array import array
-from typing import Any, Iterable, Optional, Union
+from binascii import crc_hqx
+from typing import Any, Callable, Iterable, Optional, Union
 
 __all__ = ("X25CRCCalculator",)
 
 
+CRCFunction = Callable[[bytes, int], int]
+"""Type alias for functions that take a buffer and the current value of the
+CRC and return the updated CRC.
+"""
+
+
+def _load_fastcrc() -> Optional[CRCFunction]:
+    """Returns the CRC-16/MCRF4XX function of ``fastcrc``, or ``None`` if
+    ``fastcrc`` is not installed.
+    """
+    try:
+        from fastcrc.crc16 import mcrf4xx  # type: ignore
+    except ImportError:
+        return None
+    else:
+        return mcrf4xx
+
+
+def _load_crcmod() -> Optional[CRCFunction]:
+    """Returns a CRC-16/MCRF4XX function created with ``crcmod``, or ``None``
+    if ``crcmod`` is not installed or its C extension is not available. The
+    pure Python fallback of ``crcmod`` is slower than ``_crc_hqx_mcrf4xx()``
+    so it is not used.
+    """
+    try:
+        import crcmod._crcfunext  # type: ignore # noqa: F401
+        from crcmod import mkCrcFun  # type: ignore
+    except ImportError:
+        return None
+    else:
+        return mkCrcFun(0x11021, initCrc=0xFFFF, rev=True, xorOut=0)
+
+
+_REVERSED_BITS = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+"""Translation table that reverses the order of the bits in each byte."""
+
+
+def _crc_hqx_mcrf4xx(buf: bytes, crc: int) -> int:
+    """Calculates CRC-16/MCRF4XX with ``binascii.crc_hqx()`` from the
+    standard library.
+
+    ``crc_hqx()`` calculates CRC-16/XMODEM, which uses the same polynomial as
+    CRC-16/MCRF4XX but processes the bits of each byte in the opposite order.
+    Reversing the bits of each input byte as well as the bits of the CRC on
+    the way in and out therefore yields CRC-16/MCRF4XX.
+    """
+    rev = _REVERSED_BITS
+    crc = crc_hqx(buf.translate(rev), (rev[crc & 0xFF] << 8) | rev[crc >> 8])
+    return (rev[crc & 0xFF] << 8) | rev[crc >> 8]
+
+
+def _find_crc_function() -> CRCFunction:
+    """Returns the fastest CRC-16/MCRF4XX implementation that is available.
+
+    The implementations are tried in the following order:
+
+    - ``fastcrc``
+    - ``crcmod``, but only if its C extension is available
+    - ``binascii.crc_hqx()`` from the standard library, which is always
+      available
+    """
+    return _load_fastcrc() or _load_crcmod() or _crc_hqx_mcrf4xx
+
+
+_mcrf4xx = _find_crc_function()
+"""CRC-16/MCRF4XX function used by ``X25CRCCalculator``."""
+
+
+def _to_bytes(buf: Any) -> bytes:
+    """Converts a buffer passed to a CRC calculator to a ``bytes`` object."""
+    return buf.encode() if isinstance(buf, str) else bytes(buf)
+
+
 class X25CRCCalculator:
-    """CRC-16/MCRF4XX - based on checksum.h from mavlink library"""
+    """CRC-16/MCRF4XX - based on checksum.h from mavlink library
+
+    The CRC is calculated with the fastest implementation that is available
+    when the module is imported; see ``_find_crc_function()``.
+    """
 
     crc: int
 
     def __init__(self, buf: Optional[Union[bytes, str]] = None):
-        self.crc = 0xFFFF
-        if buf is not None:
-            if isinstance(buf, str):
-                self.accumulate_str(buf)
-            else:
-                self.accumulate(buf)
+        if buf is None:
+            self.crc = 0xFFFF
+        else:
+            if type(buf) is not bytes:
+                buf = _to_bytes(buf)
+            self.crc = _mcrf4xx(buf, 0xFFFF)
 
     def accumulate(self, buf: Iterable[int]) -> None:
         """add in some more bytes"""
-        accum = self.crc
-        for b in buf:
-            tmp = b ^ (accum & 0xFF)
-            tmp = (tmp ^ (tmp << 4)) & 0xFF
-            accum = (accum >> 8) ^ (tmp << 8) ^ (tmp << 3) ^ (tmp >> 4)
-        self.crc = accum
+        if type(buf) is not bytes:
+            buf = bytes(buf)
+        self.crc = _mcrf4xx(buf, self.crc)  # type: ignore
 
     def accumulate_str(self, buf: Any) -> None:
         """add in some more bytes"""
-        bytes_array = array("B")
-        try:  # if buf is bytes
-            bytes_array.frombytes(buf)
-        except TypeError:  # if buf is str
-            bytes_array.frombytes(buf.encode())
-        self.accumulate(bytes_array)
+        self.accumulate(buf.encode() if isinstance(buf, str) else buf)
@@ -0,0 +1,219 @@
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from types import ModuleType
+
+from pytest import fixture, raises
+
+
+@fixture(scope="module")
+def generator() -> ModuleType:
+    """Loads the dialect generator script as a module."""
+    path = Path(__file__).parent.parent / "tools" / "generate-from-pymavlink.py"
+    spec = spec_from_file_location("generate_from_pymavlink", path)
+    assert spec is not None and spec.loader is not None
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Excerpts of a dialect generated by pymavlink, containing every line that the
+# generator patches
+TEMPLATE = b'''\
+from pymavlink.generator.mavcrc import x25crc
+native_supported = platform.system() != "Windows"
+
+
+class MAVLink_message(object):
+    """base MAVLink message class"""
+
+    id = 0
+    msgname = ""
+    fieldnames: List[str] = []
+    ordered_fieldnames: List[str] = []
+    fieldtypes: List[str] = []
+    orders: List[int] = []
+    lengths: List[int] = []
+    array_lengths: List[int] = []
+    crc_extra = 0
+
+    def _pack(self, mav: "MAVLink", crc_extra: int, payload: bytes, force_mavlink1: bool = False) -> bytes:
+        self._msgbuf = bytearray(self._header.pack(force_mavlink1=force_mavlink1))
+        self._msgbuf += self._payload
+        crc = x25crc(self._msgbuf[1:])
+        # we are using CRC extra
+        crc.accumulate(struct.pack("B", crc_extra))
+        self._crc = crc.crc
+        self._msgbuf += struct.pack("<H", self._crc)
+        return bytes(self._msgbuf)
+
+
+class MAVLink_heartbeat_message(MAVLink_message):
+    id = MAVLINK_MSG_ID_HEARTBEAT
+    msgname = "HEARTBEAT"
+    fieldnames = ["type", "autopilot"]
+    ordered_fieldnames = ["autopilot", "type"]
+    fieldtypes = ["uint8_t", "char"]
+    orders = [1, 0]
+    lengths = [1, 4]
+    array_lengths = [0, 4]
+    crc_extra = 50
+
+
+class MAVLink_ping_message(MAVLink_message):
+    id = MAVLINK_MSG_ID_PING
+    msgname = "PING"
+    fieldnames = ["seq"]
+    ordered_fieldnames = ["seq"]
+    fieldtypes = ["uint32_t"]
+    orders = [0]
+    lengths = [1]
+    array_lengths = [0]
+    crc_extra = 237
+
+
+class MAVLink(object):
+    def decode(self, msgbuf: bytearray) -> MAVLink_message:
+        msgtype = mavlink_map[mapkey]
+        order_map = msgtype.orders
+        len_map = msgtype.lengths
+        crc_extra = msgtype.crc_extra
+
+        if sum(len_map) == len(len_map):
+            # message has no arrays in it
+            for i in range(0, len(tlist)):
+                tlist[i] = t[order_map[i]]
+        else:
+            # message has some arrays
+            tlist = []
+            for i in range(0, len(order_map)):
+                order = order_map[i]
+                L = len_map[order]
+                tip = sum(len_map[:order])
+                field = t[tip]
+'''
+
+PATCHED_TEMPLATE = b'''\
+from flockwave.protocols.mavlink.utils import X25CRCCalculator as x25crc
+native_supported = False
+
+
+class MAVLink_message(object):
+    """base MAVLink message class"""
+
+    id = 0
+    msgname = ""
+    fieldnames: Tuple[str, ...] = ()
+    ordered_fieldnames: Tuple[str, ...] = ()
+    fieldtypes: Tuple[str, ...] = ()
+    orders: Tuple[int, ...] = ()
+    lengths: Tuple[int, ...] = ()
+    has_array: bool = False
+    cumulative_lengths: Tuple[int, ...] = ()
+    array_lengths: Tuple[int, ...] = ()
+    crc_extra = 0
+
+    def _pack(self, mav: "MAVLink", crc_extra: int, payload: bytes, force_mavlink1: bool = False) -> bytes:
+        self._msgbuf = bytearray(self._header.pack(force_mavlink1=force_mavlink1))
+        self._msgbuf += self._payload
+        crcbuf = self._msgbuf[1:]
+        # we are using CRC extra
+        crcbuf.append(crc_extra)
+        crc = x25crc(crcbuf)
+        self._crc = crc.crc
+        self._msgbuf += struct.pack("<H", self._crc)
+        return bytes(self._msgbuf)
+
+
+class MAVLink_heartbeat_message(MAVLink_message):
+    id = MAVLINK_MSG_ID_HEARTBEAT
+    msgname = "HEARTBEAT"
+    fieldnames = ("type", "autopilot")
+    ordered_fieldnames = ("autopilot", "type")
+    fieldtypes = ("uint8_t", "char")
+    orders = (1, 0)
+    lengths = (1, 4)
+    has_array = True
+    cumulative_lengths = (0, 1)
+    array_lengths = (0, 4)
+    crc_extra = 50
+
+
+class MAVLink_ping_message(MAVLink_message):
+    id = MAVLINK_MSG_ID_PING
+    msgname = "PING"
+    fieldnames = ("seq",)
+    ordered_fieldnames = ("seq",)
+    fieldtypes = ("uint32_t",)
+    orders = (0,)
+    lengths = (1,)
+    has_array = False
+    cumulative_lengths = (0,)
+    array_lengths = (0,)
+    crc_extra = 237
+
+
+class MAVLink(object):
+    def decode(self, msgbuf: bytearray) -> MAVLink_message:
+        msgtype = mavlink_map[mapkey]
+        order_map = msgtype.orders
+        len_map = msgtype.lengths
+        clen_map = msgtype.cumulative_lengths
+        crc_extra = msgtype.crc_extra
+
+        if not msgtype.has_array:
+            # message has no arrays in it
+            for i in range(0, len(tlist)):
+                tlist[i] = t[order_map[i]]
+        else:
+            # message has some arrays
+            tlist = []
+            for i in range(0, len(order_map)):
+                order = order_map[i]
+                L = len_map[order]
+                tip = clen_map[order]
+                field = t[tip]
+'''
+
+
+def test_process_dialect_code(generator: ModuleType):
+    assert generator.process_dialect_code(TEMPLATE) == PATCHED_TEMPLATE
+
+
+def test_process_dialect_code_strips_whitespace(generator: ModuleType):
+    code = b"\n\n" + TEMPLATE + b"\n\n"
+    assert generator.process_dialect_code(code) == PATCHED_TEMPLATE
+
+
+def test_partially_applied_pack_patch(generator: ModuleType):
+    # CRC_EXTRA line of the _pack() template of older pymavlink versions
+    code = TEMPLATE.replace(
+        b'crc.accumulate(struct.pack("B", crc_extra))',
+        b"crc.accumulate_str(struct.pack('B', crc_extra))",
+    )
+    with raises(RuntimeError, match="crc.accumulate"):
+        generator.process_dialect_code(code)
+
+
+def test_partially_applied_decoder_patch(generator: ModuleType):
+    code = TEMPLATE.replace(
+        b"len_map = msgtype.lengths", b"len_map = list(msgtype.lengths)"
+    )
+    with raises(RuntimeError, match="len_map = msgtype.lengths"):
+        generator.process_dialect_code(code)
+
+
+def test_duplicate_patched_line(generator: ModuleType):
+    code = TEMPLATE.replace(
+        b"                field = t[tip]",
+        b"                tip = sum(len_map[:order])\n                field = t[tip]",
+    )
+    with raises(RuntimeError, match="found 2 times"):
+        generator.process_dialect_code(code)
+
+
+def test_class_attribute_not_patched(generator: ModuleType):
+    code = TEMPLATE.replace(
+        b"    lengths = [1]\n", b"    lengths = [\n        1,\n    ]\n"
+    )
+    with raises(RuntimeError, match="'lengths' was expected in all 2 message"):
+        generator.process_dialect_code(code)
@@ -0,0 +1,92 @@
+from random import Random
+from typing import Callable, Iterable, List
+
+from pytest import fixture, mark, param, skip
+
+from flockwave.protocols.mavlink import utils
+from flockwave.protocols.mavlink.utils import X25CRCCalculator
+
+CRCFunction = Callable[[bytes, int], int]
+
+
+def reference_mcrf4xx(buf: Iterable[int], crc: int) -> int:
+    """Bitwise CRC-16/MCRF4XX implementation from checksum.h of the MAVLink
+    C library, used as the reference in the tests.
+    """
+    for b in buf:
+        tmp = b ^ (crc & 0xFF)
+        tmp = (tmp ^ (tmp << 4)) & 0xFF
+        crc = (crc >> 8) ^ (tmp << 8) ^ (tmp << 3) ^ (tmp >> 4)
+    return crc
+
+
+def _get_backend(name: str) -> CRCFunction:
+    if name == "fastcrc":
+        func = utils._load_fastcrc()
+    elif name == "crcmod":
+        func = utils._load_crcmod()
+    else:
+        func = utils._crc_hqx_mcrf4xx
+    if func is None:
+        skip(f"{name} is not installed")
+    return func
+
+
+BACKENDS = [param(name, id=name) for name in ("fastcrc", "crcmod", "crc_hqx")]
+
+
+@fixture(params=BACKENDS)
+def backend(request, monkeypatch) -> CRCFunction:
+    """Returns each CRC backend in turn and makes X25CRCCalculator use it."""
+    func = _get_backend(request.param)
+    monkeypatch.setattr(utils, "_mcrf4xx", func)
+    return func
+
+
+def random_buffers(seed: int = 42) -> List[bytes]:
+    rng = Random(seed)
+    return [rng.randbytes(length) for length in range(281)]
+
+
+def test_reference_implementation():
+    # Check value from the catalogue of parametrised CRC algorithms
+    assert reference_mcrf4xx(b"123456789", 0xFFFF) == 0x6F91
+
+
+def test_backend(backend: CRCFunction):
+    rng = Random(1)
+    assert backend(b"123456789", 0xFFFF) == 0x6F91
+    for buf in random_buffers():
+        init = rng.randrange(65536)
+        assert backend(buf, init) == reference_mcrf4xx(buf, init)
+
+
+@mark.parametrize("factory", [bytes, bytearray, list])
+def test_calculator(backend: CRCFunction, factory: Callable[[bytes], Iterable[int]]):
+    rng = Random(2)
+    for buf in random_buffers():
+        expected = reference_mcrf4xx(buf, 0xFFFF)
+        assert X25CRCCalculator(factory(buf)).crc == expected
+
+        init = rng.randrange(65536)
+        split = rng.randrange(len(buf) + 1)
+        crc = X25CRCCalculator()
+        crc.crc = init
+        crc.accumulate(factory(buf[:split]))
+        crc.accumulate(factory(buf[split:]))
+        assert crc.crc == reference_mcrf4xx(buf, init)
+
+
+def test_calculator_with_str(backend: CRCFunction):
+    expected = reference_mcrf4xx("héllo".encode(), 0xFFFF)
+    assert X25CRCCalculator("héllo").crc == expected
+
+    crc = X25CRCCalculator()
+    crc.accumulate_str("hé")
+    crc.accumulate_str(b"llo")
+    assert crc.crc == expected
+
+
+def test_default_calculator_is_valid():
+    assert X25CRCCalculator(b"123456789").crc == 0x6F91
+    assert X25CRCCalculator().crc == 0xFFFF
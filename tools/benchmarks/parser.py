@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Benchmarks the MAVLink parser of a dialect on a captured MAVLink stream.
+
+The input file must contain a sequence of pickled ``bytes`` objects, each of
+which is a chunk of the captured stream (typically the payload of a UDP
+packet), written with consecutive calls to `pickle.dump()`. Chunks are read
+one by one so the capture does not need to fit in memory. For sake of
+compatibility, the input file may also contain a single pickled list of
+chunks.
+"""
+
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+from contextlib import closing
+from mmap import ACCESS_READ, mmap
+from os import fstat
+from pickle import Unpickler
+from time import monotonic_ns
+from typing import BinaryIO, Counter as CounterType, Iterable, Iterator, List, Type
+
+import sys
+
+from flockwave.protocols.mavlink.introspection import import_dialect, preload_dialects
+from flockwave.protocols.mavlink.types import MAVLinkMessage
+
+
+def create_parser() -> ArgumentParser:
+    """Creates a command line argument parser for the entry point of the script."""
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dialect",
+        default="ardupilotmega",
+        help="name of the MAVLink dialect to use. Defaults to ardupilotmega.",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=0,
+        help=(
+            "merge consecutive chunks of the capture into batches of the given "
+            "size (in KiB) before parsing. Zero disables batching; this is the "
+            "default."
+        ),
+    )
+    parser.add_argument("input", help="name of the file containing the capture")
+    return parser
+
+
+def read_chunks(fp: BinaryIO) -> Iterator[bytes]:
+    """Reads the chunks of a captured stream from the given file one by one."""
+    # Empty files cannot be memory-mapped
+    if fstat(fp.fileno()).st_size == 0:
+        return
+
+    with closing(mmap(fp.fileno(), 0, access=ACCESS_READ)) as buf:
+        unpickler = Unpickler(buf)  # type: ignore
+        while True:
+            try:
+                item = unpickler.load()
+            except EOFError:
+                break
+            if isinstance(item, list):
+                yield from item
+            else:
+                yield item
+
+
+def merge_chunks(chunks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """Merges consecutive chunks of a captured stream into batches that are at
+    least as large as the given size (except the last one).
+    """
+    batch: List[bytes] = []
+    length = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b"".join(batch)
+            batch.clear()
+            length = 0
+    if batch:
+        yield b"".join(batch)
+
+
+def process_options(options: Namespace) -> int:
+    """Processes the command line options and executes the main functionality
+    of the script.
+    """
+    from rich.console import Console  # type: ignore
+    from rich.table import Table  # type: ignore
+
+    console = Console()
+
+    with console.status("Loading dialect..."):
+        preload_dialects(options.dialect)
+
+    dialect = import_dialect(options.dialect)
+    mav = dialect.MAVLink(None)
+    mav.robust_parsing = True
+
+    # Packets are counted by their class; message IDs are not suitable as keys
+    # because BAD_DATA and unknown messages inherit the ID of HEARTBEAT (zero)
+    # from the base message class
+    known_classes = set(dialect.mavlink_map.values())
+    counts: CounterType[Type[MAVLinkMessage]] = Counter()
+    num_bytes = num_packets = elapsed_ns = 0
+
+    with open(options.input, "rb") as fp, console.status("Parsing..."):
+        chunks: Iterable[bytes] = read_chunks(fp)
+        if options.batch_size > 0:
+            chunks = merge_chunks(chunks, options.batch_size * 1024)
+
+        # Only the parser is timed; reading the capture is not
+        for chunk in chunks:
+            num_bytes += len(chunk)
+            start_time = monotonic_ns()
+            packets = mav.parse_buffer(chunk)
+            if packets:
+                num_packets += len(packets)
+                for packet in packets:
+                    cls = type(packet)
+                    if cls in known_classes:
+                        counts[cls] += 1
+            elapsed_ns += monotonic_ns() - start_time
+
+    elapsed = elapsed_ns / 1e9
+
+    table = Table("Message type", "Count")
+    for cls, count in sorted(
+        counts.items(), key=lambda item: (-item[1], item[0].msgname)
+    ):
+        table.add_row(cls.msgname, str(count))
+    console.print(table)
+
+    console.log(
+        f"Parsed [b]{num_packets}[/b] packets in [b]{elapsed:.3f}[/b] seconds, "
+        f"[b]{num_packets - sum(counts.values())}[/b] were invalid or unknown"
+    )
+    if elapsed_ns > 0:
+        console.log(
+            f"Throughput: [b]{num_packets / elapsed:.0f}[/b] packets/s, "
+            f"[b]{num_bytes / elapsed / 1e6:.2f}[/b] MB/s"
+        )
+    else:
+        console.log("Throughput cannot be calculated, the parser was not timed")
+
+    return 0
+
+
+def main() -> int:
+    parser = create_parser()
+    options = parser.parse_args()
+    return process_options(options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
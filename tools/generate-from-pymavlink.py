@@ -4,17 +4,23 @@ version of ``pymavlink``.
 """
 
 from argparse import ArgumentParser, Namespace
-from collections import defaultdict
+from ast import literal_eval
+from concurrent.futures import as_completed, ProcessPoolExecutor
 from contextlib import contextmanager, ExitStack
+from errno import EXDEV
 from functools import partial
 from pathlib import Path
-from subprocess import PIPE, Popen, run
-from shutil import move, rmtree
+from pickle import loads
+from subprocess import PIPE, run
+from sysconfig import get_path
+from shutil import move, rmtree, which
 from tempfile import TemporaryDirectory
 from textwrap import dedent
-from typing import DefaultDict, Dict, Iterator, List, Optional
+from threading import Thread
+from typing import Counter, Dict, Iterator, List, Match, Optional, Tuple
 from venv import create as create_virtualenv
 
+import re
 import sys
 
 
@@ -27,11 +33,34 @@ def create_parser() -> ArgumentParser:
         "--work-dir",
         help="directory to use as a working folder. Defaults to a temporary folder.",
     )
+    parser.add_argument(
+        "--venv-dir",
+        help=(
+            "directory to keep the virtualenv with pymavlink in between runs. "
+            "The virtualenv is created if the directory does not exist or is "
+            "empty; pymavlink is installed into an existing virtualenv if it "
+            "is missing from there. Other non-empty directories are left "
+            "intact unless --refresh is given. Defaults to a new virtualenv "
+            "in the working folder for every run."
+        ),
+    )
+    parser.add_argument(
+        "--refresh",
+        default=False,
+        action="store_true",
+        help=(
+            "re-create the virtualenv given with --venv-dir even if it exists, "
+            "deleting the contents of the directory"
+        ),
+    )
     parser.add_argument(
         "--format",
         default=False,
         action="store_true",
-        help="format the generated code with ruff",
+        help=(
+            "format the generated code with ruff. Formatting is optional; the "
+            "generated code is valid without it"
+        ),
     )
     parser.add_argument(
         "-o",
@@ -66,89 +95,448 @@ def call_pip(*args: str, in_venv: Optional[Path] = None) -> None:
     call_python("-m", "pip", *args, in_venv=in_venv)
 
 
-def find_dialects_in_venv(venv: Path) -> Dict[str, List[str]]:
-    """Finds all the MAVLink dialects in a ``pymavlink`` installation within the
-    given virtualenv.
-    """
-    py = partial(call_python, in_venv=venv)
+_UV_EXECUTABLE = which("uv")
+"""Path to the ``uv`` executable; ``None`` if ``uv`` is not installed."""
 
-    result: DefaultDict[str, List[str]] = defaultdict(list)
 
-    for dialect_version in ("v10", "v20"):
-        pkg = f"pymavlink.dialects.{dialect_version}"
-        lines = py(
-            "-c",
-            "from importlib.resources import contents; "
-            + f"print('\\n'.join(contents('{pkg}')))",
+def create_venv(venv: Path) -> None:
+    """Creates a new, empty virtualenv in the given folder, replacing any
+    existing virtualenv there.
+
+    Uses ``uv`` if it is installed as it does not need to bootstrap pip into
+    the virtualenv; falls back to the ``venv`` module otherwise.
+    """
+    if _UV_EXECUTABLE:
+        if venv.exists():
+            rmtree(venv)
+        run(
+            [_UV_EXECUTABLE, "venv", "-q", "--python", sys.executable, str(venv)],
+            check=True,
         )
-        for line in lines.split(b"\n"):
-            if (
-                line.endswith(b".py")
-                and b"__init__" not in line
-                and not line.endswith(b"test.py")
-            ):
-                result[dialect_version].append(line.decode("ascii")[:-3])
-    return dict(result)
-
-
-def get_pymavlink_version_in_venv(venv: Path) -> str:
-    """Returns the version of ``pymavlink`` installed within the given
-    virtualenv.
+    else:
+        create_virtualenv(venv, clear=True, symlinks=True, with_pip=True)
+
+
+def is_venv(path: Path) -> bool:
+    """Returns whether the given folder contains a virtualenv."""
+    return (path / "pyvenv.cfg").is_file() and (path / "bin" / "python").exists()
+
+
+def install_dependencies_in_venv(venv: Path) -> None:
+    """Installs the latest version of ``pymavlink`` in the given virtualenv.
+
+    Uses ``uv`` if it is installed as it resolves and downloads packages
+    considerably faster than pip; falls back to pip otherwise.
+    """
+    if _UV_EXECUTABLE:
+        python = str(venv / "bin" / "python")
+        uv_pip = [_UV_EXECUTABLE, "pip", "install", "-q", "--python", python]
+        run([*uv_pip, "-U", "pymavlink"], check=True)
+    else:
+        # pip is upgraded on its own first so the remaining packages are
+        # installed with the new version in a single invocation
+        pip = partial(call_pip, in_venv=venv)
+        pip("install", "-q", "-U", "pip")
+        pip("install", "-q", "-U", "wheel", "pymavlink")
+
+
+_READ_PYMAVLINK_SCRIPT = """\
+from importlib.resources import contents, read_binary
+from pickle import dump
+import sys
+
+try:
+    import pymavlink
+except ImportError:
+    result = None
+else:
+    dialects_by_version = {}
+    for version in ("v10", "v20"):
+        pkg = f"pymavlink.dialects.{version}"
+        dialects = dialects_by_version[version] = {}
+        for name in contents(pkg):
+            if name.endswith(".py") and "__init__" not in name and not name.endswith("test.py"):
+                dialects[name[:-3]] = read_binary(pkg, name)
+    result = pymavlink.__version__, dialects_by_version
+dump(result, sys.stdout.buffer)
+"""
+"""Python script that reads the version of ``pymavlink`` and the source code
+of all the MAVLink dialects in it, and writes them to its standard output as
+a single pickled tuple, or a pickled ``None`` if ``pymavlink`` is not
+installed.
+"""
+
+DialectSources = Dict[str, Dict[str, bytes]]
+"""Type alias for the source code of MAVLink dialects, keyed by protocol
+version and then by the name of the dialect.
+"""
+
+_DIALECT_VERSIONS = ("v10", "v20")
+"""MAVLink protocol versions to generate dialects for."""
+
+_METADATA_VERSION_RE = re.compile(r"^Version:\s*(\S+)\s*$", re.MULTILINE)
+"""Regular expression matching the version number in the metadata of an
+installed Python package.
+"""
+
+
+def _is_dialect_file(name: str) -> bool:
+    """Returns whether the file with the given name in the dialects package of
+    ``pymavlink`` contains a MAVLink dialect.
     """
     return (
-        call_python(
-            "-c", "import pymavlink; print(pymavlink.__version__)", in_venv=venv
-        )
-        .decode("utf-8")
-        .strip()
+        name.endswith(".py") and "__init__" not in name and not name.endswith("test.py")
     )
 
 
-def read_dialect(dialect: str, version: str, *, in_venv: Path) -> bytes:
-    py = partial(call_python, in_venv=in_venv)
-    pkg = f"pymavlink.dialects.{version}"
-    return py(
-        "-c",
-        "from importlib.resources import read_binary; import sys; "
-        + f"sys.stdout.buffer.write(read_binary('{pkg}', '{dialect}.py'))",
-    )
+def _read_pymavlink_from_site_packages(
+    venv: Path,
+) -> Optional[Tuple[str, DialectSources]]:
+    """Reads the version of ``pymavlink`` and the source code of all the
+    MAVLink dialects directly from the ``site-packages`` folder of the given
+    virtualenv, without starting its Python interpreter.
 
+    Returns:
+        the version of ``pymavlink`` and the source code of the dialects, or
+        ``None`` if ``pymavlink`` was not found at the usual location in the
+        virtualenv
+    """
+    site_packages = list((venv / "lib").glob("python*/site-packages"))
+    if len(site_packages) != 1:
+        return None
+
+    dist_infos = list(site_packages[0].glob("pymavlink-*.dist-info"))
+    if len(dist_infos) != 1:
+        return None
+
+    metadata = (dist_infos[0] / "METADATA").read_text(encoding="utf-8")
+    match = _METADATA_VERSION_RE.search(metadata)
+    if not match:
+        return None
+
+    package = site_packages[0] / "pymavlink" / "dialects"
+    dialects_by_version: DialectSources = {}
+    for version in _DIALECT_VERSIONS:
+        paths = [
+            path
+            for path in (package / version).glob("*.py")
+            if _is_dialect_file(path.name)
+        ]
+        if not paths:
+            return None
+        dialects_by_version[version] = {path.stem: path.read_bytes() for path in paths}
+
+    return match.group(1), dialects_by_version
+
+
+def read_pymavlink_in_venv(venv: Path) -> Optional[Tuple[str, DialectSources]]:
+    """Reads the version of ``pymavlink`` installed within the given virtualenv
+    and the source code of all the MAVLink dialects in it.
+
+    Both are read directly from the ``site-packages`` folder of the virtualenv
+    if ``pymavlink`` is installed at the usual location. Otherwise they are
+    read with a single invocation of the Python interpreter of the virtualenv.
+
+    Returns:
+        the version of ``pymavlink`` and the source code of each dialect, keyed
+        by protocol version and then by the name of the dialect, or ``None``
+        if the virtualenv does not exist or ``pymavlink`` is not installed in
+        it
+    """
+    if not (venv / "bin" / "python").exists():
+        return None
+
+    result = _read_pymavlink_from_site_packages(venv)
+    if result is None:
+        result = loads(call_python("-c", _READ_PYMAVLINK_SCRIPT, in_venv=venv))
+    return result
+
+
+_INDENT_RE = re.compile(rb"^(\s*)")
+"""Regular expression matching the indentation of a line."""
+
+_REPLACED_LINES: Dict[bytes, Tuple[bytes, ...]] = {
+    # Use the precomputed array layout of the message classes in the decoder
+    b"len_map = msgtype.lengths": (
+        b"len_map = msgtype.lengths",
+        b"clen_map = msgtype.cumulative_lengths",
+    ),
+    b"if sum(len_map) == len(len_map):": (b"if not msgtype.has_array:",),
+    b"tip = sum(len_map[:order])": (b"tip = clen_map[order]",),
+    # Calculate the CRC of outbound messages with a single call, including the
+    # CRC_EXTRA byte, just like the decoder does for inbound messages
+    b"crc = x25crc(self._msgbuf[1:])": (b"crcbuf = self._msgbuf[1:]",),
+    b'crc.accumulate(struct.pack("B", crc_extra))': (
+        b"crcbuf.append(crc_extra)",
+        b"crc = x25crc(crcbuf)",
+    ),
+}
+"""Lines to replace in the code of the dialects, keyed by the line without
+indentation. Each line may be replaced by multiple lines, which inherit the
+indentation of the original line.
+
+The replacements depend on each other (e.g., ``crcbuf`` is defined by one
+line and used by another), so each of these lines must occur exactly once in
+a dialect; see ``_check_patches()``.
+"""
 
-def _patch_dialect_code(code: bytes) -> bytes:
-    result: List[bytes] = []
-    for line in code.strip().split(b"\n"):
-        if line.startswith(b"native_supported ="):
-            line = b"native_supported = False"
-        elif line.startswith(b"from pymavlink.generator.mavcrc import x25crc"):
-            line = b"from flockwave.protocols.mavlink.utils import X25CRCCalculator as x25crc"
-        result.append(line)
-    return b"\n".join(result) + b"\n"
-
-
-def process_dialect_code(code: bytes, *, format: bool = False) -> bytes:
-    code = _patch_dialect_code(code)
-    if format:
-        proc = Popen(
-            [
-                sys.executable,
-                "-m",
-                "ruff",
-                "format",
-                "-q",
-                "--target-version",
-                "py37",
-                "-",
-            ],
-            stdin=PIPE,
-            stdout=PIPE,
-            stderr=None,
+_TUPLE_CLASS_ATTRIBUTES: Tuple[bytes, ...] = (
+    b"fieldnames",
+    b"ordered_fieldnames",
+    b"fieldtypes",
+    b"orders",
+    b"lengths",
+    b"array_lengths",
+)
+"""Class attributes of the MAVLink message classes that are turned from lists
+into tuples in the code of the dialects. The ``has_array`` and
+``cumulative_lengths`` class attributes used by the patched decoder are
+derived from ``lengths``.
+"""
+
+_MESSAGE_CLASS_RE = re.compile(
+    rb"^class MAVLink_\w+_message\(MAVLink_message\):", re.MULTILINE
+)
+"""Regular expression matching the first line of the MAVLink message classes
+in the code of a dialect.
+"""
+
+_PATCH_RE = re.compile(
+    rb"^(?:"
+    rb"(?P<native_supported>native_supported =.*)"
+    rb"|(?P<x25crc_import>from pymavlink\.generator\.mavcrc import x25crc.*)"
+    rb"|[ \t]*(?:"
+    rb"(?P<statement>" + b"|".join(re.escape(line) for line in _REPLACED_LINES) + rb")"
+    rb"|(?P<attr_name>" + b"|".join(_TUPLE_CLASS_ATTRIBUTES) + rb")"
+    rb"(?:: List\[(?P<attr_type>str|int)\])? = \[(?P<attr_items>.*)\]"
+    rb")[ \t]*"
+    rb")$",
+    re.MULTILINE,
+)
+"""Regular expression matching all the lines in the code of a dialect that
+need to be patched.
+"""
+
+
+def _keep_indent(tmpl: bytes, line: bytes) -> bytes:
+    """Prepends the indentation of the given template line to another line."""
+    return _INDENT_RE.match(tmpl).group(1) + line  # type: ignore
+
+
+def _get_message_length_constants(line: bytes) -> List[bytes]:
+    """Given a line that defines the ``lengths`` class attribute of a MAVLink
+    message class, returns the lines that define the ``has_array`` and
+    ``cumulative_lengths`` class attributes of the same class.
+
+    ``has_array`` tells whether the message has an array field, while
+    ``cumulative_lengths`` is a tuple where the i-th item is the index of the
+    first item of the i-th field in the unpacked payload. Both are used by the
+    patched decoder in the ``MAVLink`` class so it does not need to calculate
+    these for every decoded message.
+    """
+    annotated = b":" in line.split(b"=", 1)[0]
+    lengths: List[int] = literal_eval(line.split(b"=", 1)[1].strip().decode("ascii"))
+
+    cumulative_lengths: List[int] = []
+    total = 0
+    for length in lengths:
+        cumulative_lengths.append(total)
+        total += length
+
+    has_array = f"{sum(lengths) != len(lengths)}"
+    clen_map = repr(tuple(cumulative_lengths))
+    if annotated:
+        return [
+            _keep_indent(line, f"has_array: bool = {has_array}".encode("ascii")),
+            _keep_indent(
+                line,
+                f"cumulative_lengths: Tuple[int, ...] = {clen_map}".encode("ascii"),
+            ),
+        ]
+    else:
+        return [
+            _keep_indent(line, f"has_array = {has_array}".encode("ascii")),
+            _keep_indent(line, f"cumulative_lengths = {clen_map}".encode("ascii")),
+        ]
+
+
+def _get_tuple_class_attribute(match: Match[bytes]) -> bytes:
+    """Given a match of ``_PATCH_RE`` on a line that defines a list-typed class
+    attribute of a MAVLink message class (e.g., ``fieldnames``), returns the
+    line that defines the same attribute as a tuple.
+    """
+    name, type, items = match["attr_name"], match["attr_type"], match["attr_items"]
+    if not items:
+        value = b"()"
+    elif b", " in items:
+        value = b"(" + items + b")"
+    else:
+        value = b"(" + items + b",)"
+
+    if type:
+        line = name + b": Tuple[" + type + b", ...] = " + value
+    else:
+        line = name + b" = " + value
+    return _keep_indent(match[0], line)
+
+
+def _patch_line(match: Match[bytes]) -> bytes:
+    """Returns the patched version of a line matched by ``_PATCH_RE``."""
+    line = match[0]
+    if match["native_supported"]:
+        return b"native_supported = False"
+    elif match["x25crc_import"]:
+        return (
+            b"from flockwave.protocols.mavlink.utils import X25CRCCalculator as x25crc"
+        )
+    elif match["attr_name"]:
+        line = _get_tuple_class_attribute(match)
+        if match["attr_name"] == b"lengths":
+            return b"\n".join([line, *_get_message_length_constants(line)])
+        else:
+            return line
+    else:
+        return b"\n".join(
+            _keep_indent(line, replacement)
+            for replacement in _REPLACED_LINES[match["statement"]]
         )
-        formatted_code = proc.communicate(code, timeout=60)[0]
-        if proc.returncode:
-            raise RuntimeError(f"ruff exited with return code {proc.returncode}")
+
+
+def _check_patches(counts: Counter[bytes], num_message_classes: int) -> None:
+    """Checks whether all the patches were applied to the code of a dialect.
+
+    Parameters:
+        counts: the number of times each line in ``_REPLACED_LINES`` was
+            replaced in the dialect, and the number of times each class
+            attribute in ``_TUPLE_CLASS_ATTRIBUTES`` was replaced in the
+            message classes of the dialect
+        num_message_classes: the number of message classes in the dialect
+
+    Raises:
+        RuntimeError: if a line was not replaced exactly once, or a class
+            attribute was not replaced in every message class. This typically
+            happens when the code template of ``pymavlink`` has changed, and
+            the patched dialect would fail at runtime.
+    """
+    for line in _REPLACED_LINES:
+        if counts[line] != 1:
+            raise RuntimeError(
+                f"Line {line.decode('ascii')!r} was expected exactly once in "
+                f"the dialect, found {counts[line]} times"
+            )
+
+    for attr in _TUPLE_CLASS_ATTRIBUTES:
+        if counts[attr] != num_message_classes:
+            raise RuntimeError(
+                f"Class attribute {attr.decode('ascii')!r} was expected in all "
+                f"{num_message_classes} message classes of the dialect, found "
+                f"{counts[attr]} times"
+            )
+
+
+def _patch_dialect_code(code: bytes) -> bytes:
+    counts: Counter[bytes] = Counter()
+
+    def patch_line(match: Match[bytes]) -> bytes:
+        if match["statement"]:
+            counts[match["statement"]] += 1
+        elif match["attr_name"] and not match["attr_type"]:
+            # Annotated attributes belong to the MAVLink_message base class
+            counts[match["attr_name"]] += 1
+        return _patch_line(match)
+
+    result = _PATCH_RE.sub(patch_line, code.strip()) + b"\n"
+    _check_patches(counts, len(_MESSAGE_CLASS_RE.findall(code)))
+    return result
+
+
+def process_dialect_code(code: bytes) -> bytes:
+    return _patch_dialect_code(code)
+
+
+def _find_ruff() -> Tuple[str, ...]:
+    """Returns the command to invoke ``ruff`` with.
+
+    The native ``ruff`` executable is preferred as it does not need to start a
+    Python interpreter first. It is looked up in the scripts folder of the
+    Python interpreter running this script first so the ``ruff`` version
+    pinned in the development dependencies is used even if the virtualenv is
+    not activated, and on the path only after that.
+    """
+    ruff = which("ruff", path=get_path("scripts")) or which("ruff")
+    return (ruff,) if ruff else (sys.executable, "-m", "ruff")
+
+
+_RUFF_COMMAND = _find_ruff()
+"""Command to invoke ``ruff`` with."""
+
+
+def format_directory(path: Path) -> None:
+    """Formats all the Python source files in the given directory and its
+    subdirectories in place with a single invocation of ``ruff``.
+    """
+    run(
+        [*_RUFF_COMMAND, "format", "-q", "--target-version", "py37", str(path)],
+        check=True,
+    )
+
+
+def generate_dialect(dialect: str, code: bytes, *, output_dir: Path) -> Path:
+    """Patches the code of a single dialect and writes it to the given output
+    directory.
+
+    This function is executed in worker processes so it must be picklable.
+
+    Returns:
+        the path of the generated file
+    """
+    try:
+        code = process_dialect_code(code)
+    except RuntimeError as ex:
+        raise RuntimeError(f"Failed to patch dialect {dialect!r}: {ex}") from ex
+
+    path = output_dir / f"{dialect}.py"
+    path.write_bytes(code)
+    return path
+
+
+def replace_dir(source: Path, target: Path) -> Optional[Thread]:
+    """Moves a directory to the given target path, replacing the directory
+    that is already there.
+
+    The existing directory is renamed out of the way first so the new one can
+    be moved into place with a single rename if both are on the same
+    filesystem. The old directory is then deleted in a background thread so
+    the caller does not have to wait for it.
+
+    Returns:
+        the thread that deletes the old directory or ``None`` if there was no
+        directory at the target path
+    """
+    old_target = target.with_name(target.name + ".old")
+    if old_target.exists():
+        rmtree(old_target)
+
+    if target.exists():
+        target.rename(old_target)
     else:
-        formatted_code = code
-    return formatted_code
+        old_target = None
+
+    try:
+        source.rename(target)
+    except OSError as ex:
+        if ex.errno != EXDEV:
+            if old_target:
+                old_target.rename(target)
+            raise
+        move(source, target)
+
+    if old_target:
+        thread = Thread(target=rmtree, args=(old_target,))
+        thread.start()
+        return thread
+    else:
+        return None
 
 
 def process_options(options: Namespace) -> int:
@@ -159,28 +547,56 @@ def process_options(options: Namespace) -> int:
     from rich.progress import track  # type: ignore
 
     console = Console()
+    cleanup_threads: List[Thread] = []
+
     with ExitStack() as stack:
         work_dir = stack.enter_context(create_work_dir(options.work_dir))
-        venv_dir = work_dir / "venv"
         output_dir = work_dir / "output"
 
-        pip = partial(call_pip, in_venv=venv_dir)
+        if options.venv_dir is None:
+            venv_dir = work_dir / "venv"
+            pymavlink = None
+        else:
+            venv_dir = Path(options.venv_dir).resolve()
+            with console.status("Reading dialects..."):
+                pymavlink = (
+                    None if options.refresh else read_pymavlink_in_venv(venv_dir)
+                )
+
+        if pymavlink is None:
+            keep_venv_dir = options.venv_dir is not None and not options.refresh
+            if keep_venv_dir and is_venv(venv_dir):
+                console.log(f"Using existing virtualenv in [b]{venv_dir}[/b]")
+            elif keep_venv_dir and venv_dir.exists() and any(venv_dir.iterdir()):
+                console.log(
+                    f"[red][b]{venv_dir}[/b] is not empty and it does not "
+                    "contain a virtualenv. Use --refresh to delete its contents "
+                    "and create a new virtualenv there.[/red]"
+                )
+                return 1
+            else:
+                with console.status("Creating virtualenv..."):
+                    create_venv(venv_dir)
+                console.log(f"Created virtualenv in [b]{venv_dir}[/b]")
 
-        with console.status("Creating virtualenv..."):
-            create_virtualenv(venv_dir, clear=True, symlinks=True, with_pip=True)
-        console.log(f"Created virtualenv in [b]{venv_dir}[/b]")
+            with console.status("Installing dependencies..."):
+                install_dependencies_in_venv(venv_dir)
 
-        packages = ["pip", "wheel", "pymavlink"]
-        for package in packages:
-            with console.status(f"Installing {package}..."):
-                pip("install", "-q", "-U", package)
+            console.log(f"Dependencies installed in [b]{venv_dir}[/b]")
 
-        console.log(f"Dependencies installed in [b]{venv_dir}[/b]")
+            with console.status("Reading dialects..."):
+                pymavlink = read_pymavlink_in_venv(venv_dir)
+            if pymavlink is None:
+                raise RuntimeError("pymavlink was not installed in the virtualenv")
+        else:
+            console.log(f"Using existing virtualenv in [b]{venv_dir}[/b]")
 
-        pymavlink_version = get_pymavlink_version_in_venv(venv_dir)
+        pymavlink_version, dialects_by_version = pymavlink
         console.log(f"PyMAVLink is at version [b]{pymavlink_version}[/b]")
 
-        dialects_by_version = find_dialects_in_venv(venv_dir)
+        executor = stack.enter_context(ProcessPoolExecutor())
+        futures = []
+
         for dialect_version in sorted(dialects_by_version):
             dialect_output_dir = output_dir / "dialects" / dialect_version
             dialect_output_dir.mkdir(parents=True, exist_ok=True)
@@ -193,13 +609,22 @@ def process_options(options: Namespace) -> int:
                 )
             )
 
-            for dialect in track(
-                dialects_by_version[dialect_version],
-                description=f"Copying {dialect_version} dialects...",
-            ):
-                code = read_dialect(dialect, version=dialect_version, in_venv=venv_dir)
-                formatted_code = process_dialect_code(code, format=options.format)
-                (dialect_output_dir / f"{dialect}.py").write_bytes(formatted_code)
+            for dialect, code in dialects_by_version[dialect_version].items():
+                future = executor.submit(
+                    generate_dialect, dialect, code, output_dir=dialect_output_dir
+                )
+                futures.append(future)
+
+        for future in track(
+            as_completed(futures),
+            total=len(futures),
+            description="Copying dialects...",
+        ):
+            future.result()
+
+        if options.format:
+            with console.status("Formatting generated code..."):
+                format_directory(output_dir / "dialects")
 
         (output_dir / "dialects" / "__init__.py").write_text(
             dedent(
@@ -217,11 +642,19 @@ def process_options(options: Namespace) -> int:
         with console.status("Moving generated files to output folder..."):
             final_dir.mkdir(parents=True, exist_ok=True)
             for output_subdir in output_dir.glob("*"):
-                if (final_dir / output_subdir.name).exists():
-                    rmtree(final_dir / output_subdir.name)
-                move(output_subdir, final_dir)
+                thread = replace_dir(output_subdir, final_dir / output_subdir.name)
+                if thread:
+                    cleanup_threads.append(thread)
 
         console.log(f"Output generated in [b]{final_dir}[/b]")
+        if not options.format:
+            console.log(
+                f"Run [b]ruff format {final_dir / 'dialects'}[/b] to format the "
+                "generated files"
+            )
+
+    for thread in cleanup_threads:
+        thread.join()
 
     return 0
 
@@ -229,6 +662,8 @@ def process_options(options: Namespace) -> int:
 def main() -> int:
     parser = create_parser()
     options = parser.parse_args()
+    if options.refresh and options.venv_dir is None:
+        parser.error("--refresh can only be used together with --venv-dir")
     return process_options(options)
 
 